@@ -1,14 +1,212 @@
+import csv
+import os
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+DATA_CSV = "train.csv"
+DATA_PARQUET = "train.parquet"
+YEAR_COL = "_year"
+CSV_BLOCK_SIZE = 16 << 20
+FRAME_CACHE_ENTRIES = 2
+FILTER_CACHE_ENTRIES = 32
 
 st.set_page_config(page_title="Sales Dashboard", layout="wide")
 
+COLUMN_TYPES = (pa.int64(), pa.float64(), pa.string())
+
+def widen_type(column, level):
+    # Index of the first type in COLUMN_TYPES, from `level` on, that every
+    # value of `column` casts to. A short prefix is tried first because a
+    # failing cast over a whole text column is slow.
+    while level < len(COLUMN_TYPES) - 1:
+        try:
+            pc.cast(column.slice(0, 4096), COLUMN_TYPES[level])
+            pc.cast(column, COLUMN_TYPES[level])
+            return level
+        except pa.ArrowInvalid:
+            level += 1
+    return level
+
+def build_parquet():
+    # Stream the CSV block by block so the whole text never has to sit in
+    # memory. Blocks are first written as text, since a type guessed from the
+    # first block could reject values further down; each column's type is
+    # widened as the blocks go by, and the typed Parquet file is then written
+    # from the text copy. Temp files keep a failed build from leaving a
+    # stale cache.
+    with open(DATA_CSV, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f))
+    reader = pacsv.open_csv(
+        DATA_CSV,
+        read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=True,
+        ),
+    )
+    schema = pa.schema(
+        field.with_name(field.name.strip().lower()) for field in reader.schema
+    )
+    levels = [0] * len(schema)
+    text_path = DATA_PARQUET + ".text.tmp"
+    tmp_path = DATA_PARQUET + ".tmp"
+    try:
+        with pq.ParquetWriter(text_path, schema, compression="none") as writer:
+            for batch in reader:
+                levels = [widen_type(col, level) for col, level in zip(batch.columns, levels)]
+                writer.write_batch(pa.RecordBatch.from_arrays(batch.columns, schema=schema))
+
+        typed_schema = pa.schema(
+            field.with_type(COLUMN_TYPES[level]) for field, level in zip(schema, levels)
+        )
+        with pq.ParquetWriter(tmp_path, typed_schema, compression="zstd") as writer:
+            for batch in pq.ParquetFile(text_path).iter_batches():
+                writer.write_table(pa.Table.from_batches([batch]).cast(typed_schema))
+        os.replace(tmp_path, DATA_PARQUET)
+    finally:
+        if os.path.exists(text_path):
+            os.remove(text_path)
+
 @st.cache_data
 def load_data():
-    df = pd.read_csv("train.csv")
-    df.columns = df.columns.str.strip().str.lower()
-    return df
+    # Parse the CSV once and keep a Parquet copy next to it; later runs
+    # read the columnar file instead of re-tokenizing the CSV.
+    try:
+        if (
+            not os.path.exists(DATA_PARQUET)
+            or os.path.getmtime(DATA_PARQUET) < os.path.getmtime(DATA_CSV)
+        ):
+            build_parquet()
+    except OSError:
+        # No writable cache (e.g. a read-only deploy directory): parse the
+        # CSV directly instead.
+        df = pd.read_csv(DATA_CSV, dtype_backend="pyarrow")
+        df.columns = df.columns.str.strip().str.lower()
+        return df
+    return pd.read_parquet(DATA_PARQUET, engine="pyarrow", dtype_backend="pyarrow")
+
+# Each entry is a full copy of the data, so keep only the latest role picks.
+@st.cache_data(max_entries=FRAME_CACHE_ENTRIES)
+def prepare_data(date_col, country_col, quantity_col, price_col, customer_col, invoice_col):
+    df = load_data()
+    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+    # Coerce into Arrow dtypes so unparseable values become nulls; a float
+    # NaN inside an Arrow column is not missing and would survive dropna.
+    df[quantity_col] = pd.to_numeric(df[quantity_col], errors="coerce", dtype_backend="pyarrow")
+    df[price_col] = pd.to_numeric(df[price_col], errors="coerce", dtype_backend="pyarrow")
+
+    df = df.dropna(subset=[date_col, quantity_col, price_col])
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        # The dashboard stops on this column pick; don't multiply whatever
+        # columns were chosen (Arrow raises on integer overflow).
+        return df, [], None, None
+
+    df["sales"] = df[quantity_col] * df[price_col]
+
+    # Narrow dtypes for the filter/groupby columns; prices and sales stay
+    # float64 so the totals still add up to the cent.
+    df[quantity_col] = pd.to_numeric(df[quantity_col], downcast="integer")
+    for col in {country_col, customer_col, invoice_col} - {date_col, quantity_col, price_col}:
+        df[col] = df[col].astype("category")
+
+    df[YEAR_COL] = df[date_col].dt.year.astype("int16")
+    min_year = max_year = None
+    if len(df):
+        min_year = int(df[YEAR_COL].min())
+        max_year = int(df[YEAR_COL].max())
+
+    country_list = sorted(df[country_col].dropna().unique().tolist())
+    return df, country_list, min_year, max_year
+
+# The helpers below are keyed on the selected column roles, the sorted
+# countries tuple and the year range, so a rerun with an unchanged filter is a
+# cache hit; each keeps only the most recent filter combinations. The
+# filtered frame can be as large as the whole data set, so it keeps only a
+# couple; the small aggregates and figures keep more.
+@st.cache_data(max_entries=FRAME_CACHE_ENTRIES)
+def apply_filter(roles, countries, year_range):
+    country_col = roles[1]
+    df, country_list, min_year, max_year = prepare_data(*roles)
+    # AND the predicates into one NumPy mask in place instead of building a
+    # fresh boolean Series for every comparison and every "&". A predicate
+    # that keeps every row (the full year range, or all countries when none
+    # are missing) is skipped.
+    mask = None
+    if year_range != (min_year, max_year):
+        year = df[YEAR_COL].to_numpy()
+        mask = year >= year_range[0]
+        mask &= year <= year_range[1]
+    if len(countries) < len(country_list) or df[country_col].hasnans:
+        in_countries = df[country_col].isin(countries).to_numpy()
+        if mask is None:
+            mask = in_countries
+        else:
+            mask &= in_countries
+    return df if mask is None else df[mask]
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def kpis(roles, countries, year_range):
+    customer_col, invoice_col = roles[4], roles[5]
+    filtered_df = apply_filter(roles, countries, year_range)
+    # One per-invoice pass gives both the order count and the order value;
+    # bincount over the invoice codes avoids a hash groupby.
+    codes, invoices = pd.factorize(filtered_df[invoice_col])
+    sales = filtered_df["sales"].to_numpy()
+    valid = codes >= 0
+    per_invoice = np.bincount(codes[valid], weights=sales[valid], minlength=len(invoices))
+    total_sales = sales.sum()
+    total_customers = filtered_df[customer_col].nunique()
+    total_orders = len(invoices)
+    avg_order_value = per_invoice.mean() if total_orders else float("nan")
+    return total_sales, total_customers, total_orders, avg_order_value
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def trend_by_year(roles, countries, year_range):
+    filtered_df = apply_filter(roles, countries, year_range)
+    return (
+        filtered_df.groupby(YEAR_COL)["sales"]
+        .sum()
+        .rename_axis("year")
+        .reset_index(name="total_sales")
+    )
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def top_countries(roles, countries, year_range):
+    country_col = roles[1]
+    filtered_df = apply_filter(roles, countries, year_range)
+    return (
+        filtered_df.groupby(country_col, observed=True, sort=False)["sales"]
+        .sum()
+        .nlargest(10)
+        .reset_index()
+    )
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def preview_table(roles, countries, year_range):
+    # Hand Streamlit a 100-row Arrow table so the rerun neither unpickles the
+    # whole filtered frame nor converts the preview from pandas again.
+    filtered_df = apply_filter(roles, countries, year_range)
+    return pa.Table.from_pandas(filtered_df.head(100).drop(columns=YEAR_COL))
+
+# Figures are shared across reruns; they are rebuilt only when the filter
+# key, and so the aggregate behind them, changes.
+@st.cache_resource(max_entries=FILTER_CACHE_ENTRIES)
+def trend_chart(roles, countries, year_range):
+    trend = trend_by_year(roles, countries, year_range)
+    return px.line(trend, x="year", y="total_sales", markers=True)
+
+@st.cache_resource(max_entries=FILTER_CACHE_ENTRIES)
+def country_chart(roles, countries, year_range):
+    country_col = roles[1]
+    country_sales = top_countries(roles, countries, year_range)
+    return px.bar(country_sales, x="sales", y=country_col, orientation="h")
 
 df = load_data()
 
@@ -23,32 +221,22 @@ price_col = st.selectbox("Unit price column", cols)
 customer_col = st.selectbox("Customer ID column", cols)
 invoice_col = st.selectbox("Invoice number column", cols)
 
-df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-df[quantity_col] = pd.to_numeric(df[quantity_col], errors="coerce")
-df[price_col] = pd.to_numeric(df[price_col], errors="coerce")
-
-df = df.dropna(subset=[date_col, quantity_col, price_col])
+roles = (date_col, country_col, quantity_col, price_col, customer_col, invoice_col)
+df, country_list, min_year, max_year = prepare_data(*roles)
 
 if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
     st.error("Selected date column is not datetime-compatible")
     st.stop()
 
-df["sales"] = df[quantity_col] * df[price_col]
-
-years = df[date_col].dt.year.dropna().unique()
-
-if len(years) < 2:
+if min_year is None or min_year == max_year:
     st.error("Not enough valid year values")
     st.stop()
 
-min_year = int(years.min())
-max_year = int(years.max())
-
-countries = st.sidebar.multiselect(
+countries = tuple(sorted(st.sidebar.multiselect(
     "Countries",
-    sorted(df[country_col].dropna().unique()),
-    default=sorted(df[country_col].dropna().unique())[:5]
-)
+    country_list,
+    default=country_list[:5]
+)))
 
 year_range = st.sidebar.slider(
     "Year Range",
@@ -57,15 +245,7 @@ year_range = st.sidebar.slider(
     (min_year, max_year)
 )
 
-filtered_df = df[
-    (df[country_col].isin(countries)) &
-    (df[date_col].dt.year.between(year_range[0], year_range[1]))
-]
-
-total_sales = filtered_df["sales"].sum()
-total_customers = filtered_df[customer_col].nunique()
-total_orders = filtered_df[invoice_col].nunique()
-avg_order_value = filtered_df.groupby(invoice_col)["sales"].sum().mean()
+total_sales, total_customers, total_orders, avg_order_value = kpis(roles, countries, year_range)
 
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Total Sales", f"{total_sales:,.2f}")
@@ -73,24 +253,10 @@ c2.metric("Customers", total_customers)
 c3.metric("Orders", total_orders)
 c4.metric("Avg Order Value", f"{avg_order_value:,.2f}")
 
-trend = (
-    filtered_df.groupby(filtered_df[date_col].dt.year)["sales"]
-    .sum()
-    .reset_index(name="total_sales")
-)
-
-fig1 = px.line(trend, x=date_col, y="total_sales", markers=True)
+fig1 = trend_chart(roles, countries, year_range)
 st.plotly_chart(fig1, use_container_width=True)
 
-top_countries = (
-    filtered_df.groupby(country_col)["sales"]
-    .sum()
-    .reset_index()
-    .sort_values("sales", ascending=False)
-    .head(10)
-)
-
-fig2 = px.bar(top_countries, x="sales", y=country_col, orientation="h")
+fig2 = country_chart(roles, countries, year_range)
 st.plotly_chart(fig2, use_container_width=True)
 
-st.dataframe(filtered_df.head(100))
+st.dataframe(preview_table(roles, countries, year_range))
@@ -0,0 +1,115 @@
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+ROLES = ["invoicedate", "country", "quantity", "unitprice", "customerid", "invoiceno"]
+CSV = """InvoiceNo,Quantity,InvoiceDate,UnitPrice,CustomerID,Country
+536365,6,12/01/2010 08:26,2.55,17850,United Kingdom
+536365,bad,12/01/2010 08:26,3.39,17850,United Kingdom
+536366,2,12/01/2010 08:28,1.85,17851,France
+C536379,-1,12/01/2010 09:41,27.50,,France
+536367,4,01/05/2011 10:00,4.25,12583,
+536368,3,02/07/2011 11:30,1.65,12583,Germany
+"""
+
+
+def run_app(tmp_path, monkeypatch):
+    (tmp_path / "train.csv").write_text(CSV)
+    monkeypatch.chdir(tmp_path)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    for box, role in zip(at.selectbox, ROLES):
+        box.set_value(role)
+    at.run()
+    at.sidebar.multiselect[0].set_value(at.sidebar.multiselect[0].options)
+    return at.run()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    return run_app(tmp_path, monkeypatch)
+
+
+def metrics(at):
+    return {m.label: m.value for m in at.metric}
+
+
+def test_unparseable_numbers_are_dropped(app):
+    assert not app.exception
+    assert metrics(app) == {
+        "Total Sales": f"{6 * 2.55 + 2 * 1.85 - 27.50 + 3 * 1.65:,.2f}",
+        "Customers": "3",
+        "Orders": "4",
+        "Avg Order Value": f"{(6 * 2.55 + 2 * 1.85 - 27.50 + 3 * 1.65) / 4:,.2f}",
+    }
+
+
+def test_blank_country_is_missing(app):
+    assert app.sidebar.multiselect[0].options == ["France", "Germany", "United Kingdom"]
+
+
+def test_preview_has_source_columns_only(app):
+    assert list(app.dataframe[0].value.columns) == [
+        "invoiceno", "quantity", "invoicedate", "unitprice", "customerid", "country", "sales"
+    ]
+
+
+def test_unwritable_cache_falls_back_to_csv(app, tmp_path, monkeypatch):
+    expected = metrics(app)
+    (tmp_path / "train.parquet").unlink()
+    (tmp_path / "train.parquet.tmp").mkdir()
+    at = run_app(tmp_path, monkeypatch)
+    assert not at.exception
+    assert not (tmp_path / "train.parquet").exists()
+    assert metrics(at) == expected
+
+
+def test_parquet_cache_is_typed(app, tmp_path):
+    schema = pq.read_schema(tmp_path / "train.parquet")
+    assert schema.field("unitprice").type == pa.float64()
+    assert schema.field("customerid").type == pa.int64()
+    assert schema.field("quantity").type == pa.string()
+    assert schema.field("country").type == pa.string()
+
+
+def select(at, countries=None, years=None):
+    if countries is not None:
+        at.sidebar.multiselect[0].set_value(countries)
+    if years is not None:
+        at.sidebar.slider[0].set_value(years)
+    return at.run()
+
+
+def kpi(total, customers, orders):
+    return {
+        "Total Sales": f"{total:,.2f}",
+        "Customers": str(customers),
+        "Orders": str(orders),
+        "Avg Order Value": f"{total / orders:,.2f}",
+    }
+
+
+def test_narrowed_year_range(app):
+    assert metrics(select(app, years=(2011, 2011))) == kpi(3 * 1.65, 1, 1)
+    assert metrics(select(app, years=(2010, 2010))) == kpi(6 * 2.55 + 2 * 1.85 - 27.50, 2, 3)
+    assert not app.exception
+
+
+def test_all_countries_match_the_sum_of_subsets(app):
+    everything = metrics(app)
+    uk = metrics(select(app, countries=["United Kingdom"]))
+    rest = metrics(select(app, countries=["France", "Germany"]))
+    assert uk == kpi(6 * 2.55, 1, 1)
+    assert rest == kpi(2 * 1.85 - 27.50 + 3 * 1.65, 2, 3)
+    # The blank-country row stays out even though no country is deselected.
+    assert everything == kpi(6 * 2.55 + 2 * 1.85 - 27.50 + 3 * 1.65, 3, 4)
+
+
+def test_year_and_country_predicates_combine(app):
+    assert metrics(select(app, countries=["France", "Germany"], years=(2011, 2011))) == kpi(3 * 1.65, 1, 1)